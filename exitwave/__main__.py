@@ -18,9 +18,8 @@ from exitwave.auth import authenticate
 from exitwave.monitor import PositionMonitor
 
 
-def _print_banner():
-    """Print the ExitWave startup banner."""
-    banner = rf"""
+# Formatted once at import — printed at every startup
+_BANNER = rf"""
     ╔══════════════════════════════════════════════════════╗
     ║                                                      ║
     ║   ███████╗██╗  ██╗██╗████████╗                       ║
@@ -40,8 +39,12 @@ def _print_banner():
     ║   Ride the trade. ExitWave catches the fall.         ║
     ║                                                      ║
     ╚══════════════════════════════════════════════════════╝
-    """
-    print(banner)
+"""
+
+
+def _print_banner():
+    """Print the ExitWave startup banner."""
+    print(_BANNER)
 
 
 def main():
@@ -9,24 +9,59 @@ Handles the complete login flow:
   5. Persist access_token to .env
 """
 
+import hashlib
+import json
 import os
 import re
+import stat
 import threading
 import time
 import webbrowser
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 
 from kiteconnect import KiteConnect
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from exitwave.notifier import flush_logging, get_logger
+
+_log = get_logger()
+
+# Skip the kite.profile() round-trip if the same token was validated this recently
+_TOKEN_META_FILE = ".kite_token_meta.json"
+_TOKEN_META_TTL = 300  # seconds
+
+# Kite HTTP connection pool — comfortably above the executor's exit workers
+_HTTP_POOL_SIZE = 16
+
+# request_token in a pasted redirect URL (query string or fragment)
+_REQUEST_TOKEN_RE = re.compile(r"[?&#]request_token=([^&#\s]+)")
+
+# Static responses for the local redirect server
+_SUCCESS_HTML = b"""
+<html><body style="font-family: Arial, sans-serif; display: flex;
+align-items: center; justify-content: center; height: 100vh;
+background: #0d1117; color: #58a6ff;">
+<div style="text-align: center;">
+    <h1>ExitWave</h1>
+    <p style="color: #8b949e; font-size: 1.2em;">
+        Login successful! You can close this tab.<br>
+        ExitWave is now monitoring your positions.
+    </p>
+</div>
+</body></html>
+"""
 
-from exitwave.notifier import get_logger
+_FAILURE_HTML = b"<html><body><h1>Login failed. No request_token received.</h1></body></html>"
 
 
 class _TokenCaptureHandler(BaseHTTPRequestHandler):
     """HTTP handler that captures the request_token from Kite's redirect."""
 
     request_token = None
+    token_event = threading.Event()
 
     def do_GET(self):
         """Handle the GET redirect from Kite login."""
@@ -35,78 +70,150 @@ class _TokenCaptureHandler(BaseHTTPRequestHandler):
 
         if "request_token" in params:
             _TokenCaptureHandler.request_token = params["request_token"][0]
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-            response = """
-            <html><body style="font-family: Arial, sans-serif; display: flex;
-            align-items: center; justify-content: center; height: 100vh;
-            background: #0d1117; color: #58a6ff;">
-            <div style="text-align: center;">
-                <h1>ExitWave</h1>
-                <p style="color: #8b949e; font-size: 1.2em;">
-                    Login successful! You can close this tab.<br>
-                    ExitWave is now monitoring your positions.
-                </p>
-            </div>
-            </body></html>
-            """
-            self.wfile.write(response.encode())
+            _TokenCaptureHandler.token_event.set()
+            self._send_html(200, _SUCCESS_HTML)
         else:
-            self.send_response(400)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-            self.wfile.write(b"<html><body><h1>Login failed. No request_token received.</h1></body></html>")
+            self._send_html(400, _FAILURE_HTML)
+
+    def _send_html(self, status: int, body: bytes):
+        """Send a complete HTML response with an explicit Content-Length."""
+        self.send_response(status)
+        self.send_header("Content-type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         """Suppress default HTTP server logging."""
         pass
 
 
+def _atomic_write(path: Path, content: str):
+    """
+    Write via a temp file + rename so a crash never leaves a partial file.
+
+    Falls back to an in-place write when the directory isn't writable, e.g.
+    under the systemd unit where only .env itself is in ReadWritePaths.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    created = False
+    try:
+        # The temp file holds secrets — give it .env's mode (0600 if new)
+        # before anything is written, so a crash never leaves a readable copy
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o600
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+        try:
+            fd = os.open(tmp_path, flags, mode)
+        except FileExistsError:
+            # Stale temp from a crash keeps its old mode — replace it
+            tmp_path.unlink()
+            fd = os.open(tmp_path, flags, mode)
+        created = True
+        with os.fdopen(fd, "w") as f:
+            os.chmod(tmp_path, mode)  # O_CREAT applies the umask; restore exact bits
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        # On a read-only directory even unlinking a missing file fails (EROFS),
+        # so only clean up what this call created, and never let it block
+        # the in-place write below
+        if created:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+        path.write_text(content)
+
+
 def _save_access_token(project_root: Path, access_token: str):
     """Persist the access_token to the .env file."""
     env_path = project_root / ".env"
 
     if not env_path.exists():
         # Create .env with just the token
-        with open(env_path, "w") as f:
-            f.write(f"KITE_ACCESS_TOKEN={access_token}\n")
+        _atomic_write(env_path, f"KITE_ACCESS_TOKEN={access_token}\n")
         return
 
     content = env_path.read_text()
 
-    # Replace existing token or append
-    if "KITE_ACCESS_TOKEN" in content:
-        content = re.sub(
-            r"KITE_ACCESS_TOKEN=.*",
-            f"KITE_ACCESS_TOKEN={access_token}",
-            content,
-        )
+    # Replace existing token or append — a single scan for the key at line start
+    head, sep, rest = ("\n" + content).partition("\nKITE_ACCESS_TOKEN=")
+    if sep:
+        end = rest.find("\n")
+        tail = rest[end:] if end != -1 else "\n"
+        content = (head + sep)[1:] + access_token + tail
     else:
-        content += f"\nKITE_ACCESS_TOKEN={access_token}\n"
+        if content and not content.endswith("\n"):
+            content += "\n"
+        content += f"KITE_ACCESS_TOKEN={access_token}\n"
 
-    env_path.write_text(content)
+    _atomic_write(env_path, content)
 
 
-def _try_cached_token(api_key: str, access_token: str) -> KiteConnect | None:
+def _token_fingerprint(access_token: str) -> str:
+    """Short, non-reversible fingerprint of an access token."""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+
+def _load_token_meta(project_root: Path) -> dict:
+    """Load the last token validation record, or {} if missing/unreadable/malformed."""
+    meta_path = project_root / _TOKEN_META_FILE
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    # Hand-edited or foreign JSON must read as a cache miss, not crash auth
+    if not isinstance(meta, dict):
+        return {}
+    validated_at = meta.get("validated_at")
+    if isinstance(validated_at, bool) or not isinstance(validated_at, (int, float)):
+        return {}
+    return meta
+
+
+def _save_token_meta(project_root: Path, access_token: str, user_id: str):
+    """Record that the access_token was just validated against Kite."""
+    meta = {
+        "access_token_hash": _token_fingerprint(access_token),
+        "validated_at": time.time(),
+        "user_id": user_id,
+    }
+    try:
+        (project_root / _TOKEN_META_FILE).write_text(json.dumps(meta))
+    except OSError:
+        pass  # Cache only — never fail authentication over it
+
+
+def _try_cached_token(api_key: str, access_token: str,
+                      project_root: Path) -> KiteConnect | None:
     """
     Try to use a cached access_token. Returns KiteConnect instance if valid, None otherwise.
     """
     if not access_token:
         return None
 
-    log = get_logger()
-    log.info("Checking cached access token...")
+    _log.info("Checking cached access token...")
 
     kite = KiteConnect(api_key=api_key)
     kite.set_access_token(access_token)
 
+    meta = _load_token_meta(project_root)
+    if (meta.get("access_token_hash") == _token_fingerprint(access_token)
+            # A future validated_at (clock stepped back, edited file) is not fresh
+            and 0 <= time.time() - meta.get("validated_at", 0) < _TOKEN_META_TTL):
+        _log.info(f"Cached token fresh (skipping profile check) for {meta.get('user_id', 'N/A')}")
+        return kite
+
     try:
         profile = kite.profile()
-        log.info(f"Authenticated as: {profile['user_name']} ({profile['user_id']})")
+        _log.info(f"Authenticated as: {profile['user_name']} ({profile['user_id']})")
+        _save_token_meta(project_root, access_token, profile["user_id"])
         return kite
     except Exception:
-        log.info("Cached access token is invalid or expired.")
+        _log.info("Cached access token is invalid or expired.")
         return None
 
 
@@ -118,44 +225,41 @@ def _login_flow(api_key: str, api_secret: str, redirect_port: int, project_root:
       3. Wait for request_token
       4. Exchange for access_token
     """
-    log = get_logger()
-
     kite = KiteConnect(api_key=api_key)
 
     # Configure redirect URL — must match what's set in Kite Developer portal
     redirect_url = f"http://127.0.0.1:{redirect_port}"
     login_url = kite.login_url()
 
-    log.info(f"Starting authentication server on {redirect_url}")
-    log.info("Opening Kite login page in your browser...")
-    log.info("")
-    log.info(f"  If the browser doesn't open automatically, visit:")
-    log.info(f"  {login_url}")
-    log.info("")
-    log.info("  IMPORTANT: Your Kite app's redirect URL must be set to:")
-    log.info(f"  {redirect_url}")
-    log.info("")
+    _log.info(f"Starting authentication server on {redirect_url}")
+    _log.info("Opening Kite login page in your browser...")
+    _log.info("")
+    _log.info(f"  If the browser doesn't open automatically, visit:")
+    _log.info(f"  {login_url}")
+    _log.info("")
+    _log.info("  IMPORTANT: Your Kite app's redirect URL must be set to:")
+    _log.info(f"  {redirect_url}")
+    _log.info("")
 
     # Start local server in background
     _TokenCaptureHandler.request_token = None
-    server = HTTPServer(("127.0.0.1", redirect_port), _TokenCaptureHandler)
-    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
-    server_thread.start()
-
-    # Open browser
-    webbrowser.open(login_url)
-
-    # Wait for the request_token (timeout: 120 seconds)
-    log.info("Waiting for login... (timeout: 120 seconds)")
-    timeout = 120
-    elapsed = 0
-    while _TokenCaptureHandler.request_token is None and elapsed < timeout:
-        time.sleep(1)
-        elapsed += 1
-
-    server.shutdown()
-
-    if _TokenCaptureHandler.request_token is None:
+    _TokenCaptureHandler.token_event.clear()
+    # Threaded so a stalled favicon/prefetch request can't block the redirect
+    with ThreadingHTTPServer(("127.0.0.1", redirect_port), _TokenCaptureHandler) as server:
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        try:
+            # Open browser
+            webbrowser.open(login_url)
+
+            # Wait for the request_token (timeout: 120 seconds)
+            _log.info("Waiting for login... (timeout: 120 seconds)")
+            got_token = _TokenCaptureHandler.token_event.wait(timeout=120)
+        finally:
+            server.shutdown()
+
+    if not got_token:
         raise TimeoutError(
             "Login timed out. No request_token received within 120 seconds. "
             "Please ensure your Kite app redirect URL is set to "
@@ -163,18 +267,18 @@ def _login_flow(api_key: str, api_secret: str, redirect_port: int, project_root:
         )
 
     request_token = _TokenCaptureHandler.request_token
-    log.info("Request token received. Generating session...")
+    _log.info("Request token received. Generating session...")
 
     # Exchange request_token for access_token
     data = kite.generate_session(request_token, api_secret=api_secret)
     access_token = data["access_token"]
 
-    log.info(f"Session generated successfully.")
-    log.info(f"Authenticated as: {data.get('user_name', 'N/A')} ({data.get('user_id', 'N/A')})")
+    _log.info(f"Session generated successfully.")
+    _log.info(f"Authenticated as: {data.get('user_name', 'N/A')} ({data.get('user_id', 'N/A')})")
 
     # Persist access_token
     _save_access_token(project_root, access_token)
-    log.debug(f"Access token saved to .env")
+    _log.debug(f"Access token saved to .env")
 
     return kite
 
@@ -186,60 +290,77 @@ def _manual_login_flow(api_key: str, api_secret: str, project_root: Path) -> Kit
     User opens the login URL on their phone/personal device, completes login,
     and pastes back the request_token from the redirect URL.
     """
-    log = get_logger()
     kite = KiteConnect(api_key=api_key)
     login_url = kite.login_url()
 
-    log.info("")
-    log.info("=" * 64)
-    log.info("  MANUAL LOGIN MODE")
-    log.info("  (Use when kite.zerodha.com is blocked on your network)")
-    log.info("=" * 64)
-    log.info("")
-    log.info("  Step 1: Open this URL on your PHONE or personal device:")
-    log.info("")
-    log.info(f"  {login_url}")
-    log.info("")
-    log.info("  Step 2: Log in with your Zerodha credentials + TOTP")
-    log.info("")
-    log.info("  Step 3: After login, your browser will redirect to a URL like:")
-    log.info("    http://127.0.0.1:5678?request_token=XXXXX&action=login&status=success")
-    log.info("    (The page won't load — that's fine!)")
-    log.info("")
-    log.info("  Step 4: Copy the 'request_token' value from that URL")
-    log.info("    and paste it below.")
-    log.info("")
-
+    _log.info("")
+    _log.info("=" * 64)
+    _log.info("  MANUAL LOGIN MODE")
+    _log.info("  (Use when kite.zerodha.com is blocked on your network)")
+    _log.info("=" * 64)
+    _log.info("")
+    _log.info("  Step 1: Open this URL on your PHONE or personal device:")
+    _log.info("")
+    _log.info(f"  {login_url}")
+    _log.info("")
+    _log.info("  Step 2: Log in with your Zerodha credentials + TOTP")
+    _log.info("")
+    _log.info("  Step 3: After login, your browser will redirect to a URL like:")
+    _log.info("    http://127.0.0.1:5678?request_token=XXXXX&action=login&status=success")
+    _log.info("    (The page won't load — that's fine!)")
+    _log.info("")
+    _log.info("  Step 4: Copy the 'request_token' value from that URL")
+    _log.info("    and paste it below.")
+    _log.info("")
+
+    flush_logging()  # Instructions must be on screen before the prompt
     user_input = input("  Paste request_token (or full redirect URL): ").strip()
 
     # Extract request_token from full URL or direct paste
-    if "request_token=" in user_input:
-        parsed = parse_qs(urlparse(user_input).query)
-        if "request_token" in parsed:
-            request_token = parsed["request_token"][0]
-        else:
-            raise ValueError("Could not extract request_token from the URL.")
+    match = _REQUEST_TOKEN_RE.search(user_input)
+    if match:
+        request_token = match.group(1)
+    elif "?" in user_input or "=" in user_input:
+        raise ValueError("Could not extract request_token from the URL.")
     else:
         request_token = user_input
 
     if not request_token:
         raise ValueError("No request_token provided.")
 
-    log.info(f"Request token received ({request_token[:8]}...). Generating session...")
+    _log.info(f"Request token received ({request_token[:8]}...). Generating session...")
 
     # Exchange request_token for access_token (this calls api.kite.trade which works)
     data = kite.generate_session(request_token, api_secret=api_secret)
     access_token = data["access_token"]
 
-    log.info(f"Session generated successfully.")
-    log.info(f"Authenticated as: {data.get('user_name', 'N/A')} ({data.get('user_id', 'N/A')})")
+    _log.info(f"Session generated successfully.")
+    _log.info(f"Authenticated as: {data.get('user_name', 'N/A')} ({data.get('user_id', 'N/A')})")
 
     _save_access_token(project_root, access_token)
-    log.debug("Access token saved to .env")
+    _log.debug("Access token saved to .env")
 
     return kite
 
 
+def _configure_session(kite: KiteConnect):
+    """
+    Mount a pooled HTTP adapter on the KiteConnect session.
+
+    Polling, parallel exit workers and order retries then all reuse warm
+    keep-alive connections to api.kite.trade instead of re-handshaking TLS.
+
+    Transport retries: failed connects are retried for any request (nothing
+    was sent), read failures only for idempotent GETs such as positions().
+    Order placement (POST) is never resent here — the executor owns that.
+    """
+    retries = Retry(total=2, connect=2, read=1, status=0,
+                    allowed_methods=frozenset({"GET"}), backoff_factor=0.1)
+    adapter = HTTPAdapter(pool_connections=_HTTP_POOL_SIZE,
+                          pool_maxsize=_HTTP_POOL_SIZE, max_retries=retries)
+    kite.reqsession.mount("https://", adapter)
+
+
 def authenticate(api_key: str, api_secret: str, access_token: str,
                  force_login: bool, redirect_port: int,
                  project_root: Path, manual_login: bool = False) -> KiteConnect:
@@ -259,19 +380,21 @@ def authenticate(api_key: str, api_secret: str, access_token: str,
     Returns:
         Authenticated KiteConnect instance.
     """
-    log = get_logger()
+    kite = None
 
     # Try cached token unless force_login
     if not force_login:
-        kite = _try_cached_token(api_key, access_token)
-        if kite is not None:
-            return kite
-
-    # Manual login flow (for restricted networks)
-    if manual_login:
-        log.info("Starting manual login flow...")
-        return _manual_login_flow(api_key, api_secret, project_root)
-
-    # Full browser login flow
-    log.info("Starting Kite login flow...")
-    return _login_flow(api_key, api_secret, redirect_port, project_root)
+        kite = _try_cached_token(api_key, access_token, project_root)
+
+    if kite is None:
+        if manual_login:
+            # Manual login flow (for restricted networks)
+            _log.info("Starting manual login flow...")
+            kite = _manual_login_flow(api_key, api_secret, project_root)
+        else:
+            # Full browser login flow
+            _log.info("Starting Kite login flow...")
+            kite = _login_flow(api_key, api_secret, redirect_port, project_root)
+
+    _configure_session(kite)
+    return kite
@@ -8,13 +8,18 @@ Loads settings from:
 """
 
 import argparse
-import os
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import FrozenSet
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+
+# Repository root (parent of the exitwave package) — resolved once
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Derivative segments accepted by --exchanges
+SUPPORTED_EXCHANGES = frozenset({"NFO", "BFO", "MCX", "CDS"})
 
 
 @dataclass
@@ -33,9 +38,11 @@ class ExitWaveConfig:
 
     # Core trading parameters
     max_loss: float = 0.0           # Max loss threshold in ₹ (positive number)
-    poll_interval: int = 10         # Seconds between position polls
+    poll_interval: int = 10         # Base seconds between position polls
+    poll_interval_min: float = 2.0  # Adaptive poll floor (near threshold)
+    poll_interval_max: float = 30.0 # Adaptive poll ceiling (far from threshold)
     market_close: str = "15:30"     # Market close time IST (HH:MM)
-    exchanges: List[str] = field(default_factory=lambda: ["NFO", "BFO"])
+    exchanges: FrozenSet[str] = frozenset({"NFO", "BFO"})  # Set for O(1) per-position lookup
 
     # Behavior flags
     dry_run: bool = False           # If True, log but don't place exit orders
@@ -43,8 +50,8 @@ class ExitWaveConfig:
     manual_login: bool = False      # Manual login (paste request_token from another device)
 
     # Paths
-    project_root: Path = field(default_factory=lambda: Path(__file__).parent.parent)
-    log_dir: Path = field(default_factory=lambda: Path(__file__).parent.parent / "logs")
+    project_root: Path = field(default_factory=lambda: _PROJECT_ROOT)
+    log_dir: Path = field(default_factory=lambda: _PROJECT_ROOT / "logs")
 
     # Auth redirect server
     redirect_port: int = 5678       # Local port for auth redirect capture
@@ -53,12 +60,13 @@ class ExitWaveConfig:
 def load_env(project_root: Path) -> KiteCredentials:
     """Load Kite API credentials from .env file."""
     env_path = project_root / ".env"
-    load_dotenv(dotenv_path=env_path)
+    # Read into a dict — keeps the API secret out of os.environ
+    values = dotenv_values(env_path)
 
     return KiteCredentials(
-        api_key=os.getenv("KITE_API_KEY", ""),
-        api_secret=os.getenv("KITE_API_SECRET", ""),
-        access_token=os.getenv("KITE_ACCESS_TOKEN", ""),
+        api_key=values.get("KITE_API_KEY") or "",
+        api_secret=values.get("KITE_API_SECRET") or "",
+        access_token=values.get("KITE_ACCESS_TOKEN") or "",
     )
 
 
@@ -87,7 +95,8 @@ Examples:
         "--poll-interval",
         type=int,
         default=10,
-        help="Seconds between position polling cycles (default: 10)",
+        help="Base seconds between position polling cycles (default: 10). "
+             "Polls speed up as losses approach --max-loss and slow down when far from it.",
     )
     parser.add_argument(
         "--market-close",
@@ -99,7 +108,8 @@ Examples:
         "--exchanges",
         type=str,
         default="NFO,BFO",
-        help="Comma-separated exchanges to monitor for F&O positions (default: NFO,BFO)",
+        help="Comma-separated exchanges to monitor for F&O positions: "
+             "NFO, BFO, MCX, CDS (default: NFO,BFO)",
     )
     parser.add_argument(
         "--dry-run",
@@ -133,7 +143,20 @@ Examples:
 def build_config(args=None) -> ExitWaveConfig:
     """Build the complete ExitWave configuration from .env + CLI args."""
     cli = parse_cli_args(args)
-    project_root = Path(__file__).parent.parent
+
+    # Validate CLI-only arguments first — no need to read .env on a bad invocation
+    if cli.max_loss <= 0:
+        print("ERROR: --max-loss must be a positive number (e.g., --max-loss 5000)")
+        sys.exit(1)
+
+    exchanges = [e.strip().upper() for e in cli.exchanges.split(",")]
+    unknown = [e for e in exchanges if e not in SUPPORTED_EXCHANGES]
+    if unknown:
+        print(f"ERROR: Unsupported exchange(s) in --exchanges: {', '.join(e or '<empty>' for e in unknown)}")
+        print(f"  Supported: {', '.join(sorted(SUPPORTED_EXCHANGES))}")
+        sys.exit(1)
+
+    project_root = _PROJECT_ROOT
     credentials = load_env(project_root)
 
     # Validate credentials
@@ -143,17 +166,12 @@ def build_config(args=None) -> ExitWaveConfig:
         print(f"    {project_root / '.env.example'}")
         sys.exit(1)
 
-    # Validate max-loss
-    if cli.max_loss <= 0:
-        print("ERROR: --max-loss must be a positive number (e.g., --max-loss 5000)")
-        sys.exit(1)
-
     config = ExitWaveConfig(
         credentials=credentials,
         max_loss=cli.max_loss,
         poll_interval=cli.poll_interval,
         market_close=cli.market_close,
-        exchanges=[e.strip().upper() for e in cli.exchanges.split(",")],
+        exchanges=frozenset(exchanges),
         dry_run=cli.dry_run,
         force_login=cli.login or cli.manual_login,
         manual_login=cli.manual_login,
@@ -6,15 +6,91 @@ For LONG positions → SELL, for SHORT positions → BUY.
 All exit orders are MARKET orders for immediate execution.
 """
 
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import requests
 from kiteconnect import KiteConnect
+from kiteconnect.exceptions import KiteException, NetworkException
+from urllib3.exceptions import NewConnectionError
 
 from exitwave.positions import FnOPosition
 from exitwave.notifier import get_logger
 
+_log = get_logger()
+
+# Concurrent order round-trips; the submission rate is capped separately below
+_MAX_EXIT_WORKERS = 8
+
+# Kite allows 10 order placements/sec — space order starts (retries included)
+# slightly further apart than 0.1s to leave margin for network jitter
+_MIN_ORDER_SPACING = 0.11
+
+# HTTP statuses meaning Kite did not accept the order and it is safe to resend
+_RETRYABLE_STATUS = (429, 503)
+
+# Exit order verification polling (12 x 0.25s = 3s max)
+_VERIFY_POLL_INTERVAL = 0.25
+_VERIFY_MAX_POLLS = 12
+_TERMINAL_ORDER_STATUSES = ("COMPLETE", "REJECTED", "CANCELLED")
+
+
+def _retry_delay(attempt: int, throttled: bool = False) -> float:
+    """
+    Exponential backoff plus up to 100ms jitter: 0.2s, 0.4s, ... capped at 2s.
+    A throttled (429) attempt starts at 1s so the rate window can clear.
+    """
+    base = 1.0 if throttled else 0.2
+    return min(base * 2 ** (attempt - 1), 2.0) + random.random() * 0.1
+
+
+class _OrderRateLimiter:
+    """Hands out order start times at least `spacing` seconds apart across threads."""
+
+    def __init__(self, spacing: float):
+        self._spacing = spacing
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        """Block until this caller's slot comes up."""
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self._spacing
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Shared by every exit worker so the whole process stays under Kite's limit
+_order_limiter = _OrderRateLimiter(_MIN_ORDER_SPACING)
+
+
+def _is_connect_failure(error: Exception) -> bool:
+    """True if a requests error happened before the request reached Kite."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    # requests wraps urllib3's MaxRetryError, whose .reason is the root cause;
+    # mid-response failures (ProtocolError etc.) may follow a sent order
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, NewConnectionError)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """True if the order certainly was not placed and resending it is safe."""
+    if isinstance(error, NetworkException):
+        return True
+    if isinstance(error, KiteException):
+        return error.code in _RETRYABLE_STATUS
+    return _is_connect_failure(error)
+
 
 @dataclass
 class ExitOrderResult:
@@ -28,16 +104,46 @@ class ExitOrderResult:
     error: str = ""
 
 
+# Exit side keyed on "is long": LONG → SELL, SHORT → BUY
+_EXIT_TRANSACTION = {
+    True: KiteConnect.TRANSACTION_TYPE_SELL,
+    False: KiteConnect.TRANSACTION_TYPE_BUY,
+}
+
+
 def _determine_exit_transaction(position: FnOPosition) -> str:
-    """Determine the exit transaction type for a position."""
-    if position.quantity > 0:
-        return KiteConnect.TRANSACTION_TYPE_SELL
-    elif position.quantity < 0:
-        return KiteConnect.TRANSACTION_TYPE_BUY
-    return ""
+    """Determine the exit transaction type for a non-zero-quantity position."""
+    return _EXIT_TRANSACTION[position.quantity > 0]
+
+
+def _build_exit_plan(positions: List[FnOPosition]) -> List[Tuple[FnOPosition, Dict[str, Any]]]:
+    """
+    Resolve the full kite.place_order() arguments for every position up front.
+
+    Args:
+        positions: F&O positions to exit (all with non-zero quantity).
+
+    Returns:
+        List of (position, place_order kwargs) tuples.
+    """
+    plan = []
+    for pos in positions:
+        plan.append((pos, {
+            "variety": KiteConnect.VARIETY_REGULAR,
+            "exchange": pos.exchange,
+            "tradingsymbol": pos.tradingsymbol,
+            "transaction_type": _determine_exit_transaction(pos),
+            "quantity": abs(pos.quantity),
+            "product": pos.product,
+            "order_type": KiteConnect.ORDER_TYPE_MARKET,
+            "validity": KiteConnect.VALIDITY_DAY,
+            "tag": "ExitWave",
+        }))
+    return plan
 
 
 def place_exit_order(kite: KiteConnect, position: FnOPosition,
+                     order_params: Dict[str, Any],
                      dry_run: bool = False) -> ExitOrderResult:
     """
     Place a single exit order for a position.
@@ -45,24 +151,14 @@ def place_exit_order(kite: KiteConnect, position: FnOPosition,
     Args:
         kite: Authenticated KiteConnect instance.
         position: The F&O position to exit.
+        order_params: Pre-resolved kite.place_order() kwargs (see _build_exit_plan).
         dry_run: If True, simulate without placing.
 
     Returns:
         ExitOrderResult with order details.
     """
-    log = get_logger()
-    transaction_type = _determine_exit_transaction(position)
-    quantity = abs(position.quantity)
-
-    if not transaction_type:
-        return ExitOrderResult(
-            tradingsymbol=position.tradingsymbol,
-            exchange=position.exchange,
-            transaction_type="NONE",
-            quantity=0,
-            success=False,
-            error="Position has zero quantity, nothing to exit.",
-        )
+    transaction_type = order_params["transaction_type"]
+    quantity = order_params["quantity"]
 
     result = ExitOrderResult(
         tradingsymbol=position.tradingsymbol,
@@ -71,10 +167,9 @@ def place_exit_order(kite: KiteConnect, position: FnOPosition,
         quantity=quantity,
     )
 
-    action_str = f"{transaction_type} {quantity} {position.tradingsymbol} @ MARKET"
-
     if dry_run:
-        log.info(f"[DRY-RUN] EXIT ORDER: {action_str}")
+        _log.info("[DRY-RUN] EXIT ORDER: %s %d %s @ MARKET",
+                  transaction_type, quantity, position.tradingsymbol)
         result.success = True
         result.order_id = "DRY_RUN"
         return result
@@ -82,34 +177,35 @@ def place_exit_order(kite: KiteConnect, position: FnOPosition,
     # Place the actual market order
     max_retries = 3
     for attempt in range(1, max_retries + 1):
+        _order_limiter.acquire()
         try:
-            order_id = kite.place_order(
-                variety=KiteConnect.VARIETY_REGULAR,
-                exchange=position.exchange,
-                tradingsymbol=position.tradingsymbol,
-                transaction_type=transaction_type,
-                quantity=quantity,
-                product=position.product,
-                order_type=KiteConnect.ORDER_TYPE_MARKET,
-                validity=KiteConnect.VALIDITY_DAY,
-                tag="ExitWave",
-            )
+            order_id = kite.place_order(**order_params)
             result.order_id = order_id
             result.success = True
-            log.info(f"EXIT ORDER: {action_str} -> Order ID: {order_id}")
+            _log.info("EXIT ORDER: %s %d %s @ MARKET -> Order ID: %s",
+                      transaction_type, quantity, position.tradingsymbol, order_id)
             return result
 
         except Exception as e:
-            error_msg = str(e)
-            log.warning(
-                f"Exit order attempt {attempt}/{max_retries} failed for "
-                f"{position.tradingsymbol}: {error_msg}"
-            )
-            result.error = error_msg
+            result.error = str(e)
+            if not _is_retryable(e):
+                # Rejected orders won't succeed on resend; a timed-out or
+                # dropped request may already be live, and resending it could
+                # double the exit and flip the position
+                _log.error("FAILED to exit %s (%s, not retried): %s",
+                           position.tradingsymbol, type(e).__name__, result.error)
+                if isinstance(e, requests.exceptions.RequestException):
+                    _log.error("  Order state for %s is unknown — check the order book.",
+                               position.tradingsymbol)
+                return result
+
+            _log.warning("Exit order attempt %d/%d failed for %s: %s",
+                         attempt, max_retries, position.tradingsymbol, result.error)
             if attempt < max_retries:
-                time.sleep(1)  # Brief pause before retry
+                time.sleep(_retry_delay(attempt, getattr(e, "code", None) == 429))
 
-    log.error(f"FAILED to exit {position.tradingsymbol} after {max_retries} attempts: {result.error}")
+    _log.error("FAILED to exit %s after %d attempts: %s",
+               position.tradingsymbol, max_retries, result.error)
     return result
 
 
@@ -126,40 +222,60 @@ def exit_all_positions(kite: KiteConnect, positions: List[FnOPosition],
     Returns:
         List of ExitOrderResult for each position.
     """
-    log = get_logger()
-
-    if not positions:
-        log.info("No positions to exit.")
+    # Flat positions need no order — drop them before any dispatch work
+    open_positions = [p for p in positions if p.quantity != 0]
+    skipped = len(positions) - len(open_positions)
+    if skipped:
+        _log.debug(f"Skipped {skipped} zero-quantity position(s)")
+
+    if not open_positions:
+        _log.info("No positions to exit.")
         return []
 
     mode = "[DRY-RUN] " if dry_run else ""
-    log.critical(
-        f"{mode}THRESHOLD BREACHED! Exiting {len(positions)} open F&O position(s)..."
+    _log.critical(
+        f"{mode}THRESHOLD BREACHED! Exiting {len(open_positions)} open F&O position(s)..."
     )
 
-    results = []
-    for pos in positions:
-        result = place_exit_order(kite, pos, dry_run=dry_run)
-        results.append(result)
+    plan = _build_exit_plan(open_positions)
 
-    # Summary
-    successful = sum(1 for r in results if r.success)
-    failed = sum(1 for r in results if not r.success)
+    # Place exit orders concurrently — each is a blocking HTTPS round-trip.
+    # place_exit_order() paces the actual submissions via _order_limiter.
+    workers = min(_MAX_EXIT_WORKERS, len(plan))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ExitWave-Exit") as pool:
+        futures = [
+            pool.submit(place_exit_order, kite, pos, order_params, dry_run=dry_run)
+            for pos, order_params in plan
+        ]
+        results = [f.result() for f in futures]
 
-    if failed == 0:
-        log.info(f"{mode}All {successful} exit order(s) placed successfully.")
+    # Summary
+    successful = 0
+    failed_results = []
+    for r in results:
+        if r.success:
+            successful += 1
+        else:
+            failed_results.append(r)
+
+    if not failed_results:
+        _log.info(f"{mode}All {successful} exit order(s) placed successfully.")
     else:
-        log.error(
-            f"{mode}Exit orders: {successful} succeeded, {failed} FAILED. "
+        _log.error(
+            f"{mode}Exit orders: {successful} succeeded, {len(failed_results)} FAILED. "
             f"Check logs for details."
         )
-        for r in results:
-            if not r.success:
-                log.error(f"  FAILED: {r.transaction_type} {r.quantity} {r.tradingsymbol} — {r.error}")
+        for r in failed_results:
+            _log.error(f"  FAILED: {r.transaction_type} {r.quantity} {r.tradingsymbol} — {r.error}")
 
     return results
 
 
+def _fetch_order_book(kite: KiteConnect) -> Dict[str, Dict[str, Any]]:
+    """Fetch today's orders in a single call, keyed by order_id."""
+    return {o["order_id"]: o for o in kite.orders()}
+
+
 def verify_exit_orders(kite: KiteConnect, results: List[ExitOrderResult],
                        dry_run: bool = False) -> bool:
     """
@@ -173,45 +289,58 @@ def verify_exit_orders(kite: KiteConnect, results: List[ExitOrderResult],
     Returns:
         True if all orders completed, False otherwise.
     """
-    log = get_logger()
-
     if dry_run:
-        log.info("[DRY-RUN] Skipping order verification.")
+        _log.info("[DRY-RUN] Skipping order verification.")
         return True
 
     successful_results = [r for r in results if r.success and r.order_id]
     if not successful_results:
         return False
 
-    log.info("Verifying exit order statuses...")
-    time.sleep(2)  # Brief wait for orders to process
+    _log.info("Verifying exit order statuses...")
+
+    # Re-check the day book until every exit reaches a terminal state.
+    # Market orders usually settle in a few hundred ms; give up after ~3s.
+    book = {}
+    book_error = None
+    for _ in range(_VERIFY_MAX_POLLS):
+        time.sleep(_VERIFY_POLL_INTERVAL)
+        try:
+            book = _fetch_order_book(kite)
+            book_error = None
+        except Exception as e:
+            book_error = e
+            continue
+        if all(book.get(r.order_id, {}).get("status") in _TERMINAL_ORDER_STATUSES
+               for r in successful_results):
+            break
+    if book_error is not None:
+        _log.error("  Error fetching order book: %s", book_error)
 
     all_completed = True
     for result in successful_results:
         try:
-            order_history = kite.order_history(result.order_id)
-            if order_history:
-                latest = order_history[-1]
+            latest = book.get(result.order_id)
+            if latest is None:
+                # Not in today's book (shouldn't happen) — query the order directly
+                order_history = kite.order_history(result.order_id)
+                latest = order_history[-1] if order_history else None
+            if latest:
                 status = latest.get("status", "UNKNOWN")
                 if status == "COMPLETE":
-                    log.info(
-                        f"  CONFIRMED: {result.tradingsymbol} — "
-                        f"Order {result.order_id} COMPLETE"
-                    )
+                    _log.info("  CONFIRMED: %s — Order %s COMPLETE",
+                              result.tradingsymbol, result.order_id)
                 elif status == "REJECTED":
-                    log.error(
-                        f"  REJECTED: {result.tradingsymbol} — "
-                        f"Order {result.order_id}: {latest.get('status_message', '')}"
-                    )
+                    _log.error("  REJECTED: %s — Order %s: %s",
+                               result.tradingsymbol, result.order_id,
+                               latest.get("status_message", ""))
                     all_completed = False
                 else:
-                    log.warning(
-                        f"  PENDING: {result.tradingsymbol} — "
-                        f"Order {result.order_id} status: {status}"
-                    )
+                    _log.warning("  PENDING: %s — Order %s status: %s",
+                                 result.tradingsymbol, result.order_id, status)
                     all_completed = False
         except Exception as e:
-            log.error(f"  Error checking order {result.order_id}: {e}")
+            _log.error("  Error checking order %s: %s", result.order_id, e)
             all_completed = False
 
     return all_completed
@@ -9,26 +9,45 @@ Runs as a background thread that:
   - Stops at market close time (default 15:30 IST)
 """
 
+import bisect
+import logging
 import threading
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
-import pytz
-
 from kiteconnect import KiteConnect
 
 from exitwave.config import ExitWaveConfig
 from exitwave.executor import exit_all_positions, verify_exit_orders
 from exitwave.notifier import get_logger
 from exitwave.positions import (
-    get_open_fno_positions,
-    calculate_total_pnl,
+    fetch_positions,
+    parse_fno_positions,
+    parse_fno_positions_lite,
     format_positions_summary,
     FnOPosition,
 )
 
-IST = pytz.timezone("Asia/Kolkata")
+# India has no DST — a fixed-offset tz avoids pytz localize/normalize per call
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+# Per-poll status line: (log level, message), indexed by
+# bisect_right(_LOG_TIER_BOUNDS, loss_ratio).
+_LOG_TIER_BOUNDS = (0.5, 0.8, 1.0)
+_LOG_TIERS = (
+    (logging.INFO,
+     "[%(hh)02d:%(mm)02d:%(ss)02d] P&L: %(pnl)s | Threshold: %(threshold)s | Positions: %(count)d"),
+    (logging.WARNING,
+     "[%(hh)02d:%(mm)02d:%(ss)02d] P&L: %(pnl)s | Threshold: %(threshold)s (%(pct).0f%%) | "
+     "Positions: %(count)d"),
+    (logging.WARNING,
+     "[%(hh)02d:%(mm)02d:%(ss)02d] P&L: %(pnl)s | Threshold: %(threshold)s (%(pct).0f%%) | "
+     "Positions: %(count)d | APPROACHING THRESHOLD"),
+    (logging.CRITICAL,
+     "THRESHOLD BREACHED! P&L: %(pnl)s | Threshold: %(threshold)s | Positions: %(count)d"),
+)
 
 
 class PositionMonitor:
@@ -46,18 +65,26 @@ class PositionMonitor:
         close_parts = config.market_close.split(":")
         self._close_hour = int(close_parts[0])
         self._close_minute = int(close_parts[1])
+        self._close_dt: Optional[datetime] = None    # Today's close, rebuilt on date change
+        self._day_start: Optional[datetime] = None   # [_day_start, _day_end) is the day
+        self._day_end: Optional[datetime] = None     # _close_dt was built for
+        self._threshold_str = f"Rs.{-config.max_loss:,.2f}"
 
         # State
         self._thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        self._cv = threading.Condition()
+        self._stopping = False         # Guarded by _cv; set by stop()
         self._exit_count = 0           # Number of exit events triggered
         self._all_exit_results = []    # All exit order results across events
-        self._exited_symbols: set = set()  # Symbols already exited (avoid re-exit)
+        self._exited_symbols: set[str] = set()  # Symbols already exited (avoid re-exit)
         self._last_exit_time: Optional[datetime] = None
         self._exit_cooldown = 30       # Seconds to wait after exit before checking again
+        self._verify_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ExitWave-Verify")
+        self._pending_verifies: List[Future] = []
 
         # Stats
         self._poll_count = 0
+        self._next_interval: float = config.poll_interval  # Adapted each poll
         self._last_pnl: Optional[float] = None
         self._peak_loss: float = 0.0  # Track worst P&L seen
 
@@ -77,12 +104,13 @@ class PositionMonitor:
             self.log.warning("Monitor is already running.")
             return
 
-        self._stop_event.clear()
+        self._stopping = False
         self._exit_count = 0
         self._all_exit_results = []
         self._exited_symbols = set()
         self._last_exit_time = None
         self._poll_count = 0
+        self._next_interval = self.config.poll_interval
         self._peak_loss = 0.0
 
         self._thread = threading.Thread(
@@ -95,7 +123,7 @@ class PositionMonitor:
 
     def stop(self):
         """Signal the monitor to stop."""
-        self._stop_event.set()
+        self._signal_stop()
         if self._thread is not None:
             self._thread.join(timeout=30)
             self.log.info("Position monitor stopped.")
@@ -105,16 +133,29 @@ class PositionMonitor:
         if self._thread is not None:
             self._thread.join()
 
-    def _is_market_open(self) -> bool:
-        """Check if current IST time is before market close."""
-        now = datetime.now(IST)
-        close_time = now.replace(
-            hour=self._close_hour,
-            minute=self._close_minute,
-            second=0,
-            microsecond=0,
-        )
-        return now < close_time
+    def _signal_stop(self):
+        """Set the stop flag and wake any waiter."""
+        with self._cv:
+            self._stopping = True
+            self._cv.notify_all()
+
+    def _wait_for_stop(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds; return True early if stop was signalled."""
+        with self._cv:
+            return self._cv.wait_for(lambda: self._stopping, timeout=timeout)
+
+    def _is_market_open(self, now: datetime) -> bool:
+        """Check if the given IST time is before market close."""
+        # Plain datetime comparisons once the day's bounds are cached
+        if self._close_dt is None or not (self._day_start <= now < self._day_end):
+            day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            self._day_start = day_start
+            self._day_end = day_start + timedelta(days=1)
+            self._close_dt = day_start.replace(
+                hour=self._close_hour,
+                minute=self._close_minute,
+            )
+        return now < self._close_dt
 
     def _monitor_loop(self):
         """Main monitoring loop — runs in background thread."""
@@ -124,107 +165,129 @@ class PositionMonitor:
         log.info("=" * 60)
         log.info(f"  ExitWave Monitor Active")
         log.info(f"  Max Loss Threshold : Rs.{config.max_loss:,.2f}")
-        log.info(f"  Poll Interval      : {config.poll_interval}s")
+        log.info(
+            f"  Poll Interval      : {config.poll_interval}s "
+            f"(adaptive {min(config.poll_interval, config.poll_interval_min):g}-"
+            f"{max(config.poll_interval, config.poll_interval_max):g}s)"
+        )
         log.info(f"  Market Close       : {config.market_close} IST")
-        log.info(f"  Exchanges          : {', '.join(config.exchanges)}")
+        log.info(f"  Exchanges          : {', '.join(sorted(config.exchanges))}")
         log.info(f"  Dry Run            : {config.dry_run}")
         log.info("=" * 60)
 
-        while not self._stop_event.is_set():
+        while not self._stopping:
+            now = datetime.now(IST)
+
             # Check market hours
-            if not self._is_market_open():
+            if not self._is_market_open(now):
                 log.info(
                     f"Market close time ({config.market_close} IST) reached. "
                     f"Stopping monitor."
                 )
                 break
 
-            # If in exit cooldown, skip polling
+            # If in exit cooldown, sleep out the remainder (stop still wakes us)
             if self._last_exit_time is not None:
-                elapsed = (datetime.now(IST) - self._last_exit_time).total_seconds()
-                if elapsed < self._exit_cooldown:
-                    remaining = int(self._exit_cooldown - elapsed)
-                    if remaining % 10 == 0 and remaining > 0:
-                        log.info(f"Post-exit cooldown: resuming monitoring in {remaining}s...")
-                    self._stop_event.wait(timeout=1)
+                elapsed = (now - self._last_exit_time).total_seconds()
+                sleep_for = self._exit_cooldown - elapsed
+                if sleep_for > 0:
+                    if sleep_for > 10:
+                        if self._wait_for_stop(sleep_for - 10):
+                            continue
+                        log.info("Post-exit cooldown: resuming monitoring in 10s...")
+                        sleep_for = 10
+                    self._wait_for_stop(sleep_for)
                     continue
 
             # Poll positions
             try:
-                self._poll_positions()
+                self._poll_positions(now)
             except Exception as e:
                 log.error(f"Error during position poll: {e}")
                 self._handle_poll_error(e)
 
-            # Wait for next poll
-            self._stop_event.wait(timeout=config.poll_interval)
+            # Wait for next poll (interval adapts to proximity to threshold)
+            self._wait_for_stop(self._next_interval)
 
         log.info("Monitor loop ended.")
+        self._drain_verifies()
         self._print_session_summary()
 
-    def _poll_positions(self):
+    def _drain_verifies(self):
+        """Wait for any in-flight exit order verifications to finish."""
+        for future in self._pending_verifies:
+            try:
+                future.result()
+            except Exception as e:
+                self.log.error(f"Exit order verification failed: {e}")
+        self._pending_verifies.clear()
+
+    def _poll_positions(self, now: datetime):
         """Single poll cycle: fetch positions, check P&L, maybe exit."""
         log = self.log
         config = self.config
         self._poll_count += 1
+        self._next_interval = config.poll_interval
 
-        # Fetch open F&O positions
-        positions = get_open_fno_positions(self.kite, config.exchanges)
+        # Fetch positions — only lean (symbol, qty, pnl) rows are built per poll
+        raw = fetch_positions(self.kite)
+        rows, total_pnl = parse_fno_positions_lite(raw, config.exchanges)
 
-        if not positions:
+        if not rows:
             if self._poll_count % 6 == 1:  # Log every ~60s if no positions
                 log.info("No open F&O positions found. Continuing to monitor...")
             return
 
-        # Calculate total P&L
-        total_pnl = calculate_total_pnl(positions)
         self._last_pnl = total_pnl
 
         # Track peak loss
         if total_pnl < self._peak_loss:
             self._peak_loss = total_pnl
 
-        # Log current state
-        now_str = datetime.now(IST).strftime("%H:%M:%S")
-        position_count = len(positions)
-        pnl_str = f"Rs.{total_pnl:+,.2f}"
-        threshold_str = f"Rs.{-config.max_loss:,.2f}"
-
         # Determine log level based on proximity to threshold
-        loss_ratio = abs(total_pnl) / config.max_loss if total_pnl < 0 else 0
+        loss_ratio = -total_pnl / config.max_loss if total_pnl < 0 else 0.0
+        level, template = _LOG_TIERS[bisect.bisect_right(_LOG_TIER_BOUNDS, loss_ratio)]
+
+        # Named args let every tier template draw from the same dict
+        log.log(level, template, {
+            "hh": now.hour,
+            "mm": now.minute,
+            "ss": now.second,
+            "pnl": f"Rs.{total_pnl:+,.2f}",
+            "threshold": self._threshold_str,
+            "pct": loss_ratio * 100,
+            "count": len(rows),
+        })
+
+        self._next_interval = self._adaptive_interval(loss_ratio)
 
         if loss_ratio >= 1.0:
-            # THRESHOLD BREACHED — EXIT
-            log.critical(
-                f"THRESHOLD BREACHED! P&L: {pnl_str} | "
-                f"Threshold: {threshold_str} | "
-                f"Positions: {position_count}"
-            )
+            # THRESHOLD BREACHED — fully parse the same snapshot and EXIT
+            positions, _ = parse_fno_positions(raw, config.exchanges, full=True)
             self._trigger_exit(positions, total_pnl)
             return
-        elif loss_ratio >= 0.8:
-            log.warning(
-                f"[{now_str}] P&L: {pnl_str} | "
-                f"Threshold: {threshold_str} ({loss_ratio:.0%}) | "
-                f"Positions: {position_count} | APPROACHING THRESHOLD"
-            )
-        elif loss_ratio >= 0.5:
-            log.warning(
-                f"[{now_str}] P&L: {pnl_str} | "
-                f"Threshold: {threshold_str} ({loss_ratio:.0%}) | "
-                f"Positions: {position_count}"
-            )
-        else:
-            log.info(
-                f"[{now_str}] P&L: {pnl_str} | "
-                f"Threshold: {threshold_str} | "
-                f"Positions: {position_count}"
-            )
 
         # Every 30 polls (~5 min at 10s interval), log detailed positions
         if self._poll_count % 30 == 0:
-            summary = format_positions_summary(positions, total_pnl)
-            log.info(f"\n{summary}")
+            positions, _ = parse_fno_positions(raw, config.exchanges)
+            log.info("\n%s", format_positions_summary(positions, total_pnl))
+
+    def _adaptive_interval(self, loss_ratio: float) -> float:
+        """
+        Scale the poll interval by proximity to the loss threshold.
+
+        Falls linearly from 1.5x the base interval when flat/profitable,
+        bottoming out at 0.2x from ~87% of the threshold, then clamped to
+        [poll_interval_min, poll_interval_max]
+        (never clamped slower than the base near the threshold, or faster
+        than it when far away).
+        """
+        config = self.config
+        base = config.poll_interval
+        interval = base * max(0.2, 1.5 * (1.0 - loss_ratio))
+        floor = min(base, config.poll_interval_min)
+        ceiling = max(base, config.poll_interval_max)
+        return min(max(interval, floor), ceiling)
 
     def _trigger_exit(self, positions: List[FnOPosition], total_pnl: float):
         """Execute the exit of all open F&O positions, then continue monitoring."""
@@ -247,12 +310,13 @@ class PositionMonitor:
         self._all_exit_results.extend(results)
 
         # Track exited symbols so we don't re-exit them immediately
-        for pos in positions:
-            self._exited_symbols.add(pos.tradingsymbol)
+        self._exited_symbols.update(pos.tradingsymbol for pos in positions)
 
-        # Verify orders
+        # Verify orders in the background so monitoring resumes immediately
         if not self.config.dry_run:
-            verify_exit_orders(self.kite, results, dry_run=self.config.dry_run)
+            self._pending_verifies.append(
+                self._verify_pool.submit(verify_exit_orders, self.kite, results, dry_run=False)
+            )
 
         # Start cooldown — continue monitoring after a pause
         self._last_exit_time = datetime.now(IST)
@@ -272,12 +336,12 @@ class PositionMonitor:
                 "Authentication error — access token may have expired. "
                 "Please restart ExitWave with --login flag."
             )
-            self._stop_event.set()
+            self._signal_stop()
             return
 
         # For network errors, wait a bit longer before next poll
         log.warning(f"Will retry in {self.config.poll_interval * 2}s...")
-        self._stop_event.wait(timeout=self.config.poll_interval)
+        self._wait_for_stop(self.config.poll_interval)
 
     def _print_session_summary(self):
         """Print a summary of the monitoring session."""
@@ -289,7 +353,7 @@ class PositionMonitor:
         log.info(f"  Total polls         : {self._poll_count}")
         log.info(f"  Last P&L            : Rs.{self._last_pnl:+,.2f}" if self._last_pnl is not None else "  Last P&L            : N/A")
         log.info(f"  Peak loss           : Rs.{self._peak_loss:+,.2f}")
-        log.info(f"  Threshold           : Rs.{-self.config.max_loss:,.2f}")
+        log.info(f"  Threshold           : {self._threshold_str}")
         log.info(f"  Exit events         : {self._exit_count}")
 
         if self._all_exit_results:
@@ -5,25 +5,62 @@ Provides dual-output logging to both console (with color) and
 daily rotating log files.
 """
 
+import atexit
 import logging
 import os
+import queue
 import sys
-from datetime import datetime
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Optional
 
-import pytz
-
-IST = pytz.timezone("Asia/Kolkata")
+# Background thread that performs the actual console/file writes
+_listener: QueueListener | None = None
 
 
 class ISTFormatter(logging.Formatter):
     """Custom formatter that uses IST timezone for all timestamps."""
 
+    # IST is a fixed UTC+05:30 with no DST, so shift the epoch and use gmtime
+    _IST_OFFSET_SEC = 5 * 3600 + 30 * 60
+
     def formatTime(self, record, datefmt=None):
-        dt = datetime.fromtimestamp(record.created, tz=IST)
+        st = time.gmtime(record.created + self._IST_OFFSET_SEC)
         if datefmt:
-            return dt.strftime(datefmt)
-        return dt.strftime("%Y-%m-%d %H:%M:%S %Z")
+            return time.strftime(datefmt.replace("%Z", "IST"), st)
+        return time.strftime("%Y-%m-%d %H:%M:%S", st) + " IST"
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    File handler writing to exitwave_[dryrun_]YYYY-MM-DD.log, keyed on the
+    IST date of each record. The file is opened lazily on the first record
+    and the handler switches to a new file when a record crosses IST midnight.
+    """
+
+    def __init__(self, log_dir: Path, prefix: str = ""):
+        self._log_dir = log_dir
+        self._prefix = prefix
+        self._rollover_at = 0.0
+        super().__init__(self._path_for(time.time()), encoding="utf-8", delay=True)
+
+    def _path_for(self, ts: float) -> Path:
+        """Return the log path for timestamp ts and arm the next rollover."""
+        ist = ts + ISTFormatter._IST_OFFSET_SEC
+        # Epoch of the next IST midnight
+        self._rollover_at = (ist // 86400 + 1) * 86400 - ISTFormatter._IST_OFFSET_SEC
+        day = time.strftime("%Y-%m-%d", time.gmtime(ist))
+        return self._log_dir / f"exitwave_{self._prefix}{day}.log"
+
+    def emit(self, record):
+        if record.created >= self._rollover_at:
+            # Called with the handler lock held
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._path_for(record.created))
+        super().emit(record)
 
 
 def _enable_ansi_colors():
@@ -40,8 +77,21 @@ def _enable_ansi_colors():
 _enable_ansi_colors()
 
 
+def _stream_is_tty(stream) -> bool:
+    """True if stream is attached to a terminal (False for pipes, files, captures)."""
+    try:
+        return os.isatty(stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
 class ConsoleFormatter(ISTFormatter):
-    """Colored console output formatter. Disables colors when not a TTY."""
+    """
+    Colored console output formatter.
+
+    Pass use_color explicitly (setup_logging() checks the handler's stream);
+    if omitted, colors are enabled only when stdout is a TTY at construction.
+    """
 
     COLORS = {
         logging.DEBUG: "\033[90m",      # Grey
@@ -52,16 +102,26 @@ class ConsoleFormatter(ISTFormatter):
     }
     RESET = "\033[0m"
 
-    _use_color = sys.stdout.isatty()
+    def __init__(self, *args, use_color: Optional[bool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if use_color is None:
+            use_color = _stream_is_tty(sys.stdout)
+        self.use_color = use_color
+
+        # Whole-line templates per level, built once: (timestamp, level, message)
+        plain = "[%s] [%-5s] %s"
+        if use_color:
+            self._level_fmt = {
+                level: color + plain + self.RESET for level, color in self.COLORS.items()
+            }
+            self._default_fmt = self.RESET + plain + self.RESET
+        else:
+            self._level_fmt = {}
+            self._default_fmt = plain
 
     def format(self, record):
-        timestamp = self.formatTime(record)
-        level = record.levelname.ljust(5)
-        message = record.getMessage()
-        if self._use_color:
-            color = self.COLORS.get(record.levelno, self.RESET)
-            return f"{color}[{timestamp}] [{level}] {message}{self.RESET}"
-        return f"[{timestamp}] [{level}] {message}"
+        template = self._level_fmt.get(record.levelno, self._default_fmt)
+        return template % (self.formatTime(record), record.levelname, record.getMessage())
 
 
 def setup_logging(log_dir: Path, dry_run: bool = False) -> logging.Logger:
@@ -75,36 +135,65 @@ def setup_logging(log_dir: Path, dry_run: bool = False) -> logging.Logger:
     Returns:
         Configured logger instance.
     """
+    global _listener
+
     log_dir.mkdir(parents=True, exist_ok=True)
 
     logger = logging.getLogger("exitwave")
     logger.setLevel(logging.DEBUG)
 
     # Clear any existing handlers
+    stop_logging()
     logger.handlers.clear()
 
     # Console handler — INFO and above
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(ConsoleFormatter())
-    logger.addHandler(console_handler)
-
-    # File handler — DEBUG and above (daily log file)
-    today = datetime.now(IST).strftime("%Y-%m-%d")
-    prefix = "dryrun_" if dry_run else ""
-    log_file = log_dir / f"exitwave_{prefix}{today}.log"
+    console_handler.setFormatter(
+        ConsoleFormatter(use_color=_stream_is_tty(console_handler.stream))
+    )
 
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    # File handler — DEBUG and above (one log file per IST day)
+    file_handler = DailyFileHandler(log_dir, "dryrun_" if dry_run else "")
     file_handler.setLevel(logging.DEBUG)
     file_formatter = ISTFormatter(
         fmt="[%(asctime)s] [%(levelname)-5s] %(message)s"
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+
+    # Loggers only enqueue records; a listener thread does the I/O, so a
+    # slow disk or terminal never stalls the monitor's poll loop.
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
 
     return logger
 
 
+def flush_logging():
+    """Block until every queued log record has been written."""
+    if _listener is not None:
+        # stop() drains the queue and joins the thread; start() resumes it
+        _listener.stop()
+        _listener.start()
+
+
+def stop_logging():
+    """Flush queued log records and stop the listener thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
 def get_logger() -> logging.Logger:
     """Get the ExitWave logger (must be set up first via setup_logging)."""
     return logging.getLogger("exitwave")
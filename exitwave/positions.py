@@ -9,14 +9,18 @@ Responsible for:
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from kiteconnect import KiteConnect
 
 from exitwave.notifier import get_logger
 
 
-@dataclass
+# Lean (tradingsymbol, quantity, pnl) row used on the per-poll monitoring path
+PnLRow = Tuple[str, int, float]
+
+
+@dataclass(slots=True)
 class FnOPosition:
     """Parsed representation of a single F&O position."""
     tradingsymbol: str
@@ -27,11 +31,37 @@ class FnOPosition:
     average_price: float
     last_price: float
     pnl: float            # Unrealized P&L from Kite
-    m2m: float            # Mark-to-market P&L
-    buy_quantity: int
-    sell_quantity: int
-    buy_price: float
-    sell_price: float
+    # Broker diagnostics — only populated by from_raw_full()
+    m2m: Optional[float] = None            # Mark-to-market P&L
+    buy_quantity: Optional[int] = None
+    sell_quantity: Optional[int] = None
+    buy_price: Optional[float] = None
+    sell_price: Optional[float] = None
+
+    @classmethod
+    def from_raw_minimal(cls, pos: Dict[str, Any]) -> "FnOPosition":
+        """Build from a raw Kite position with only the fields exits and summaries use."""
+        return cls(
+            tradingsymbol=pos.get("tradingsymbol", ""),
+            exchange=pos["exchange"],
+            instrument_token=pos.get("instrument_token", 0),
+            product=pos.get("product", ""),
+            quantity=pos.get("quantity", 0),
+            average_price=pos.get("average_price", 0.0),
+            last_price=pos.get("last_price", 0.0),
+            pnl=pos.get("pnl", 0.0),
+        )
+
+    @classmethod
+    def from_raw_full(cls, pos: Dict[str, Any]) -> "FnOPosition":
+        """Build from a raw Kite position including the broker diagnostic fields."""
+        fno_pos = cls.from_raw_minimal(pos)
+        fno_pos.m2m = pos.get("m2m", 0.0)
+        fno_pos.buy_quantity = pos.get("buy_quantity", 0)
+        fno_pos.sell_quantity = pos.get("sell_quantity", 0)
+        fno_pos.buy_price = pos.get("buy_price", 0.0)
+        fno_pos.sell_price = pos.get("sell_price", 0.0)
+        return fno_pos
 
     @property
     def is_open(self) -> bool:
@@ -68,58 +98,97 @@ def fetch_positions(kite: KiteConnect) -> Dict[str, Any]:
 
 
 def parse_fno_positions(raw_positions: Dict[str, Any],
-                        exchanges: List[str]) -> List[FnOPosition]:
+                        exchanges: FrozenSet[str],
+                        full: bool = False) -> Tuple[List[FnOPosition], float]:
     """
-    Parse raw Kite positions and filter for F&O positions on given exchanges.
+    Parse raw Kite positions into open F&O positions on the given exchanges.
+
+    Filtering and P&L aggregation happen in a single pass; closed
+    (zero-quantity) rows are skipped before any FnOPosition is built.
 
     Args:
         raw_positions: Raw dict from kite.positions().
-        exchanges: List of exchanges to include (e.g., ["NFO", "BFO"]).
+        exchanges: Exchanges to include (e.g., frozenset({"NFO", "BFO"})).
+        full: If True, also populate the broker diagnostic fields
+              (m2m, buy/sell quantity and price).
 
     Returns:
-        List of FnOPosition objects for matching open positions.
+        Tuple of (open FnOPosition objects, their total P&L).
     """
+    build = FnOPosition.from_raw_full if full else FnOPosition.from_raw_minimal
     positions = []
+    total_pnl = 0.0
 
     for pos in raw_positions.get("net", []):
-        if pos.get("exchange", "") not in exchanges:
+        try:
+            if pos["exchange"] not in exchanges:
+                continue
+        except KeyError:
             continue
 
-        fno_pos = FnOPosition(
-            tradingsymbol=pos.get("tradingsymbol", ""),
-            exchange=pos.get("exchange", ""),
-            instrument_token=pos.get("instrument_token", 0),
-            product=pos.get("product", ""),
-            quantity=pos.get("quantity", 0),
-            average_price=pos.get("average_price", 0.0),
-            last_price=pos.get("last_price", 0.0),
-            pnl=pos.get("pnl", 0.0),
-            m2m=pos.get("m2m", 0.0),
-            buy_quantity=pos.get("buy_quantity", 0),
-            sell_quantity=pos.get("sell_quantity", 0),
-            buy_price=pos.get("buy_price", 0.0),
-            sell_price=pos.get("sell_price", 0.0),
-        )
+        if pos.get("quantity", 0) == 0:
+            continue
+
+        fno_pos = build(pos)
         positions.append(fno_pos)
+        total_pnl += fno_pos.pnl
 
-    return positions
+    return positions, total_pnl
+
+
+def parse_fno_positions_lite(raw_positions: Dict[str, Any],
+                             exchanges: FrozenSet[str]) -> Tuple[List[PnLRow], float]:
+    """
+    Minimal per-poll parse: only what the loss-threshold check needs.
+
+    Applies the same filters as parse_fno_positions() but builds plain
+    (tradingsymbol, quantity, pnl) tuples. Run parse_fno_positions() on the
+    same raw dict when full position details are required.
+
+    Args:
+        raw_positions: Raw dict from kite.positions().
+        exchanges: Exchanges to include (e.g., frozenset({"NFO", "BFO"})).
+
+    Returns:
+        Tuple of (open position rows, their total P&L).
+    """
+    rows = []
+    total_pnl = 0.0
+
+    for pos in raw_positions.get("net", []):
+        try:
+            if pos["exchange"] not in exchanges:
+                continue
+        except KeyError:
+            continue
+
+        quantity = pos.get("quantity", 0)
+        if quantity == 0:
+            continue
+
+        pnl = pos.get("pnl", 0.0)
+        rows.append((pos.get("tradingsymbol", ""), quantity, pnl))
+        total_pnl += pnl
+
+    return rows, total_pnl
 
 
 def get_open_fno_positions(kite: KiteConnect,
-                           exchanges: List[str]) -> List[FnOPosition]:
+                           exchanges: FrozenSet[str],
+                           full: bool = False) -> List[FnOPosition]:
     """
     Fetch and return only open F&O positions (non-zero quantity).
 
     Args:
         kite: Authenticated KiteConnect instance.
-        exchanges: Exchanges to filter (e.g., ["NFO", "BFO"]).
+        exchanges: Exchanges to filter (e.g., frozenset({"NFO", "BFO"})).
+        full: If True, also populate the broker diagnostic fields.
 
     Returns:
         List of open FnOPosition objects.
     """
-    raw = fetch_positions(kite)
-    all_fno = parse_fno_positions(raw, exchanges)
-    return [p for p in all_fno if p.is_open]
+    positions, _ = parse_fno_positions(fetch_positions(kite), exchanges, full)
+    return positions
 
 
 def calculate_total_pnl(positions: List[FnOPosition]) -> float: